@@ -1,13 +1,64 @@
+import os
+import logging
 import re
-import requests
-import json
-from bs4 import BeautifulSoup
-from dataclasses import dataclass, field, asdict
-from typing import List, Dict
+import hashlib
+import asyncio
+import orjson
+from requests.adapters import HTTPAdapter
+from requests_cache import CachedSession
+from urllib3.util import Retry
+import lxml.html
+from lxml import etree
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import List, Dict, Tuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta
 
+log = logging.getLogger(__name__)
+
 # Define the base URL for VOX Cinemas
 BASE_URL = "https://ksa.voxcinemas.com"
+# Per-day showtimes page for a movie, filled in with the slug and a YYYYMMDD date
+URL_TEMPLATE = BASE_URL + "/movies/{slug}?d={date}#showtimes"
+
+# Matches time patterns (e.g., "12:30") in a showtime entry
+TIME_PATTERN = re.compile(r'\b\d{1,2}:\d{2}\b')
+
+def is_showtimes_text(text: str) -> bool:
+    """Matches the text of the "Showtimes" link on a movie summary."""
+    return bool(text) and "Showtimes" in text
+
+# Upper bound on detail pages being downloaded at the same time
+MAX_CONCURRENT_REQUESTS = 16
+
+# Shared session so every request to the VOX host reuses pooled keep-alive connections.
+# Responses are cached on disk for an hour so reruns skip the network; today's
+# showtimes change more often, so those pages expire after 15 minutes.
+SESSION = CachedSession(
+    "vox_cache",
+    backend="sqlite",
+    expire_after=timedelta(hours=1),
+    allowable_codes=(200,),
+    urls_expire_after={
+        f"*?d={datetime.now():%Y%m%d}": timedelta(minutes=15),
+    },
+)
+SESSION.mount("https://", HTTPAdapter(
+    pool_connections=1,
+    pool_maxsize=32,
+    max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504)),
+))
+# requests already sends "Accept-Encoding: gzip, deflate"; with brotli installed
+# (see requirements.txt) it also advertises and decodes "br" automatically.
+SESSION.headers.update({
+    "User-Agent": "Mozilla/5.0 (compatible; vox-showtimes-scraper)",
+    "Accept": "text/html,application/xhtml+xml",
+})
+# Worker threads that run the blocking SESSION.get calls for the async fetch layer
+FETCH_POOL = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS)
+# Worker processes that parse downloaded detail pages, so parsing isn't serialized by the GIL
+PARSE_POOL = ProcessPoolExecutor(max_workers=os.cpu_count())
 
 @dataclass
 class Movie:
@@ -35,53 +86,84 @@ class Movie:
     # }
     timings: Dict[str, Dict[str, object]] = field(default_factory=dict)
 
+@lru_cache(maxsize=1024)
 def fetch_page(url: str) -> str:
-    """Fetches the HTML content of a given URL."""
-    response = requests.get(url)
+    """Fetches the HTML content of a given URL, memoized per URL for the life of the process."""
+    response = SESSION.get(url, timeout=10)
     response.raise_for_status()
     return response.text
 
+def xpath_class(name: str) -> str:
+    """XPath predicate matching a single class token, like bs4's class_= filter."""
+    return f'contains(concat(" ", normalize-space(@class), " "), " {name} ")'
+
+def element_text(element, separator: str = " ") -> str:
+    """Equivalent of bs4's get_text(separator, strip=True) for an lxml element."""
+    return separator.join(text.strip() for text in element.itertext() if text.strip())
+
+# XPath queries compiled once at import rather than re-parsed on every page
+MOVIE_SUMMARIES_XPATH = etree.XPath(f'//article[{xpath_class("movie-summary")}]')
+# Cinema names (<h3 class="highlight">) inside the first <div class="dates">
+PLACE_HEADERS_XPATH = etree.XPath(f'(//div[{xpath_class("dates")}])[1]//h3[{xpath_class("highlight")}]')
+# The <ol class="showtimes"> that follows a cinema header
+SHOWTIMES_OL_XPATH = etree.XPath(f'following-sibling::ol[{xpath_class("showtimes")}][1]')
+
 def parse_movies(html: str) -> List[Movie]:
     """
     Parses the 'What’s On' page to extract movie details.
     Adjust the selectors if VOX changes the site structure.
     """
-    soup = BeautifulSoup(html, 'html.parser')
-    movie_articles = soup.find_all("article", class_="movie-summary")
+    try:
+        root = lxml.html.fromstring(html)
+    except etree.ParserError:
+        return []
+    movie_articles = MOVIE_SUMMARIES_XPATH(root)
     movies = []
 
     for article in movie_articles:
-        slug = article.get("data-slug", "").strip()
-        identifier = article.get("data-identifier", "").strip()
-        title = article.get("data-title", "").strip()
+        slug = article.get("data-slug", "")
+        identifier = article.get("data-identifier", "")
+        title = article.get("data-title", "")
+
+        # Walk the article once, keeping the first element that matches each field
+        # (adjust the class names as needed)
+        desc_tag = class_span = language_p = first_a = showtimes_a = None
+        for element in article.iter("p", "span", "a"):
+            classes = element.get("class", "").split()
+            if element.tag == "a":
+                if first_a is None:
+                    first_a = element
+                if showtimes_a is None and is_showtimes_text(element.text_content()):
+                    showtimes_a = element
+            elif element.tag == "p":
+                if desc_tag is None and "movie-description" in classes:
+                    desc_tag = element
+                if language_p is None and "language" in classes:
+                    language_p = element
+            elif class_span is None and "classification" in classes:
+                class_span = element
 
-        # Attempt to extract a movie description (adjust the class name as needed)
         description = ""
-        desc_tag = article.find("p", class_="movie-description")
-        if desc_tag:
-            description = desc_tag.get_text(strip=True)
+        if desc_tag is not None:
+            description = element_text(desc_tag, "")
 
         image_url = ""
-        a_tag = article.find("a")
-        if a_tag:
-            img_tag = a_tag.find("img")
-            if img_tag:
-                image_url = img_tag.get("data-src", "").strip()
+        if first_a is not None:
+            img_tag = first_a.find(".//img")
+            if img_tag is not None:
+                image_url = img_tag.get("data-src", "")
 
         classification = ""
-        class_span = article.find("span", class_="classification")
-        if class_span:
-            classification = class_span.get_text(strip=True)
+        if class_span is not None:
+            classification = element_text(class_span, "")
 
         language = ""
-        language_p = article.find("p", class_="language")
-        if language_p:
-            language = language_p.get_text(strip=True).replace("Language:", "").strip()
+        if language_p is not None:
+            language = element_text(language_p, "").removeprefix("Language:").lstrip()
 
         showtimes_url = ""
-        showtimes_a = article.find("a", string=lambda s: s and "Showtimes" in s)
-        if showtimes_a:
-            showtimes_url = showtimes_a.get("href", "").strip()
+        if showtimes_a is not None:
+            showtimes_url = showtimes_a.get("href", "")
 
         movie = Movie(
             slug=slug,
@@ -102,41 +184,43 @@ def extract_showtimes(detail_html: str) -> Dict[str, Dict[str, List[str]]]:
     Extracts the cinema -> experience -> times structure
     from a single movie's detail page (for one specific date).
     """
-    soup = BeautifulSoup(detail_html, 'html.parser')
-    dates_div = soup.find("div", class_="dates")
-    if not dates_div:
+    # Days without showtimes have no "dates" block at all; a substring scan is far
+    # cheaper than building a tree just to find that out
+    if "dates" not in detail_html:
+        return {}
+    try:
+        root = lxml.html.fromstring(detail_html)
+    except etree.ParserError:
         return {}
-
     timings_by_place = {}
 
     # Look for each cinema name (inside an <h3 class="highlight"> tag)
-    for place_header in dates_div.find_all("h3", class_="highlight"):
-        place = place_header.get_text(" ", strip=True)
-        showtimes_ol = place_header.find_next_sibling("ol", class_="showtimes")
+    for place_header in PLACE_HEADERS_XPATH(root):
+        place = element_text(place_header)
+        showtimes_ol = SHOWTIMES_OL_XPATH(place_header)
         if not showtimes_ol:
             continue
 
         experience_dict = {}
         # Each top-level <li> in the <ol> corresponds to an experience
-        for li in showtimes_ol.find_all("li", recursive=False):
-            strong_tag = li.find("strong")
-            if not strong_tag:
+        for li in showtimes_ol[0].iterchildren("li"):
+            strong_tag = li.find(".//strong")
+            if strong_tag is None:
                 continue
-            experience = strong_tag.get_text(" ", strip=True)
-            nested_ol = li.find("ol")
-            if not nested_ol:
+            experience = element_text(strong_tag)
+            nested_ol = li.find(".//ol")
+            if nested_ol is None:
                 continue
 
             timings = []
-            for time_li in nested_ol.find_all("li"):
-                a_tag = time_li.find("a")
-                if a_tag:
-                    time_text = a_tag.get_text(" ", strip=True)
+            for time_li in nested_ol.iterdescendants("li"):
+                a_tag = time_li.find(".//a")
+                if a_tag is not None:
+                    time_text = element_text(a_tag)
                 else:
-                    time_text = time_li.get_text(" ", strip=True)
+                    time_text = element_text(time_li)
                 # Attempt to match time patterns (e.g., "12:30")
-                time_pattern = re.compile(r'\b\d{1,2}:\d{2}\b')
-                found_times = time_pattern.findall(time_text)
+                found_times = TIME_PATTERN.findall(time_text)
                 if found_times:
                     timings.extend(found_times)
                 else:
@@ -148,88 +232,125 @@ def extract_showtimes(detail_html: str) -> Dict[str, Dict[str, List[str]]]:
 
     return timings_by_place
 
-def enrich_movie_with_timings_for_dates(
+async def fetch_page_async(url: str) -> str:
+    """Fetches a page on the fetch thread pool so the event loop is never blocked."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(FETCH_POOL, fetch_page, url)
+
+def build_date_range(start_date_str: str, days_to_check: int) -> List[Tuple[str, str, str]]:
+    """
+    Returns (date_str, pretty_date, day_of_week) for each day in the range, e.g.
+    ("20250212", "2025-02-12", "Wednesday"), so the formatting is done once per run.
+    """
+    start_date = datetime.strptime(start_date_str, "%Y%m%d")
+    return [
+        (d.strftime("%Y%m%d"), d.strftime("%Y-%m-%d"), d.strftime("%A"))
+        for d in (start_date + timedelta(days=i) for i in range(days_to_check))
+    ]
+
+async def fetch_timings_for_date(
     movie: Movie,
-    start_date_str: str = "20250212",
-    days_to_check: int = 10
+    date_tuple: Tuple[str, str, str],
+    semaphore: asyncio.Semaphore,
+    parse_cache: Dict[bytes, asyncio.Future]
+) -> Tuple[str, Dict[str, object]]:
+    """
+    Fetches and parses a single movie's detail page for one date.
+    Identical pages (keyed by a digest of their HTML) are parsed only once per
+    run via parse_cache, which maps the digest to the pending or finished parse.
+    Returns the pretty date key together with its
+    {"day_of_week": ..., "showtimes": ...} entry.
+    """
+    date_str, pretty_date, day_of_week = date_tuple
+    detail_url = URL_TEMPLATE.format(slug=movie.slug, date=date_str)
+    log.debug("  => Fetching showtimes for '%s' on %s (%s)", movie.title, pretty_date, day_of_week)
+
+    try:
+        async with semaphore:
+            detail_html = await fetch_page_async(detail_url)
+        # Parse outside the semaphore and off the event loop so downloads keep flowing
+        digest = hashlib.blake2b(detail_html.encode(), digest_size=16).digest()
+        if digest not in parse_cache:
+            loop = asyncio.get_running_loop()
+            parse_cache[digest] = loop.run_in_executor(PARSE_POOL, extract_showtimes, detail_html)
+        daily_timings = await parse_cache[digest]
+    except Exception as e:
+        log.warning("[Error] '%s' on %s: %s", movie.title, pretty_date, e)
+        daily_timings = {}
+
+    return pretty_date, {
+        "day_of_week": day_of_week,
+        "showtimes": daily_timings
+    }
+
+async def enrich_movies_with_timings(
+    movies: List[Movie],
+    date_tuples: List[Tuple[str, str, str]]
 ) -> None:
     """
-    Loops over a date range for a single Movie object,
-    building daily URLs like:
+    Fetches every (movie, date) pair in one flat batch, building daily URLs like:
       https://ksa.voxcinemas.com/movies/{movie.slug}?d=YYYYMMDD#showtimes
-    and storing the results in movie.timings.
+    and storing the results in each movie's timings.
     Each date is stored as a dictionary containing:
       - "day_of_week": e.g., "Wednesday"
       - "showtimes": the cinema->experience->times structure
     The date key is a pretty date string (e.g., "2025-02-12").
     """
-    date_format = "%Y%m%d"         # used to build the URL
-    output_date_format = "%Y-%m-%d"  # used as the key in our JSON
-    start_date = datetime.strptime(start_date_str, date_format)
-
-    # Clear any existing timings data
-    movie.timings = {}
-
-    for i in range(days_to_check):
-        current_date = start_date + timedelta(days=i)
-        date_str = current_date.strftime(date_format)
-        pretty_date = current_date.strftime(output_date_format)
-        day_of_week = current_date.strftime("%A")
-        detail_url = f"{BASE_URL}/movies/{movie.slug}?d={date_str}#showtimes"
-        print(f"  => Fetching showtimes for '{movie.title}' on {pretty_date} ({day_of_week})")
-
-        try:
-            detail_html = fetch_page(detail_url)
-            daily_timings = extract_showtimes(detail_html)
-            movie.timings[pretty_date] = {
-                "day_of_week": day_of_week,
-                "showtimes": daily_timings
-            }
-        except Exception as e:
-            print(f"     [Error] {e}")
-            movie.timings[pretty_date] = {
-                "day_of_week": day_of_week,
-                "showtimes": {}
-            }
+    # One flat task list keeps the fetch slots busy regardless of which movie is slow
+    tasks = [(movie, date_tuple) for movie in movies for date_tuple in date_tuples]
+    log.info("Fetching showtimes for %d movies over %d days (%d pages)...", len(movies), len(date_tuples), len(tasks))
+
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    parse_cache = {}
+    results = await asyncio.gather(*(
+        fetch_timings_for_date(movie, date_tuple, semaphore, parse_cache)
+        for movie, date_tuple in tasks
+    ))
+
+    # Tasks are grouped by movie, so each movie owns one contiguous slice of results.
+    # Build its timings in one go; pretty dates are ISO formatted, so sorting on
+    # them keeps the JSON chronological.
+    days = len(date_tuples)
+    for i, movie in enumerate(movies):
+        day_results = results[i * days:(i + 1) * days]
+        movie.timings = dict(sorted(day_results, key=lambda item: item[0]))
 
 def save_movies_to_json_file(movies: List[Movie], filename: str = "movies.json") -> None:
     """Saves the movie data (including daily showtimes) to a JSON file in an organized manner."""
-    # Convert each Movie into a dictionary using asdict()
-    movies_dict = [asdict(movie) for movie in movies]
-    with open(filename, "w", encoding="utf-8") as f:
-        json.dump(movies_dict, f, indent=2)
-    print(f"Data saved to {filename}")
+    # orjson serializes the Movie dataclasses natively in C, so no asdict() copies are built
+    with open(filename, "wb") as f:
+        f.write(orjson.dumps(movies, option=orjson.OPT_INDENT_2))
+    log.info("Data saved to %s", filename)
 
 def main():
     """
     Main function to:
       1. Fetch the "What’s On" page listing.
       2. Parse movie details.
-      3. For each movie, enrich it with daily showtimes (including day-of-week).
+      3. Enrich every movie with daily showtimes (including day-of-week), concurrently.
       4. Save all the results to a JSON file.
     """
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     whatson_url = BASE_URL + "/movies/whatson"
-    print(f"Fetching movie listings from: {whatson_url}")
+    log.info("Fetching movie listings from: %s", whatson_url)
 
     try:
         html = fetch_page(whatson_url)
         movies = parse_movies(html)
-        print(f"Found {len(movies)} movies.\n")
+        log.info("Found %d movies.", len(movies))
 
-        # Enrich each movie with daily showtimes.
+        # Enrich all movies with daily showtimes concurrently.
         # Adjust start_date_str and days_to_check as needed.
-        for movie in movies:
-            print(f"Enriching '{movie.title}' with daily showtimes...")
-            enrich_movie_with_timings_for_dates(
-                movie,
-                start_date_str="20250212",  # starting date (YYYYMMDD)
-                days_to_check=10            # number of consecutive days to check
-            )
+        date_tuples = build_date_range(
+            start_date_str="20250212",  # starting date (YYYYMMDD)
+            days_to_check=10            # number of consecutive days to check
+        )
+        asyncio.run(enrich_movies_with_timings(movies, date_tuples))
 
         # Save all movie data to a JSON file.
         save_movies_to_json_file(movies, filename="movies.json")
     except Exception as e:
-        print(f"Error fetching movie data: {e}")
+        log.error("Error fetching movie data: %s", e)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file